@@ -13,8 +13,8 @@ Call at command line with flag -h to see options and usage instructions.
 
 import argparse
 import collections
+import fnmatch
 import functools
-import glob
 import hashlib
 import logging
 import os
@@ -24,10 +24,40 @@ import sys
 import CommonMark
 import yaml
 
+try:  # Process pools are unavailable on python 2; fall back to serial runs
+    from concurrent import futures
+except ImportError:
+    futures = None
+
 import validation_helpers as vh
 
 NUMBER_OF_ERRORS = 0
 
+# When True (CLI --fail-fast), stop validating a file at its first failed
+# test instead of running every test to report all errors at once
+STOP_ON_FIRST_FAILURE = False
+
+# Share a single parser instance between all validators: the CommonMark
+# parser can be re-used, and building one per file adds avoidable setup
+# cost to every parse
+COMMONMARK_PARSER = CommonMark.DocParser()
+
+# Patterns applied per line or per link of every document: compile them
+# once rather than on each call
+FIXME_RE = re.compile(r"FIXME", re.IGNORECASE)
+FIXME_BYTES_RE = re.compile(br"FIXME", re.IGNORECASE)
+GLOSSARY_DEFINITION_RE = re.compile(r"^:   ")
+LOCAL_HTML_LINK_RE = re.compile(r"^[\w,\s-]+\.(html?)", re.IGNORECASE)
+
+# URL schemes that mark a link as remote; plain prefix checks are much
+# cheaper than the regex engine for these
+REMOTE_LINK_PREFIXES = ("http://", "https://", "ftp://", "mailto:")
+
+# Lesson directory used when validating bare markdown strings; computed
+# once instead of on every validator construction
+DEFAULT_LESSON_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir))
+
 def incr_error(func):
     """Wrapper to count the number of errors"""
     @functools.wraps(func)
@@ -39,6 +69,20 @@ def incr_error(func):
 
 logging.error = incr_error(logging.error)
 
+# isfile answers cannot change during one run, and many pages reference
+# the same assets: memoize the stat calls
+_ISFILE_CACHE = {}
+
+
+def _isfile(path):
+    """os.path.isfile with per-run memoization"""
+    try:
+        return _ISFILE_CACHE[path]
+    except KeyError:
+        result = os.path.isfile(path)
+        _ISFILE_CACHE[path] = result
+        return result
+
 
 class MarkdownValidator(object):
     """Base class for Markdown validation
@@ -56,6 +100,10 @@ class MarkdownValidator(object):
     # Validate YAML doc headers: dict of {header text: validation_func}
     DOC_HEADERS = {}
 
+    # Cache of {(path, mtime): subtitle} shared by all validators, so that
+    # each link destination file is read and parsed at most once per run
+    _link_dest_cache = {}
+
     def __init__(self, filename=None, markdown=None):
         """Perform validation on a Markdown document.
 
@@ -67,38 +115,108 @@ class MarkdownValidator(object):
             # Expect Markdown files to be in same directory as the input file
             self.markdown_dir = os.path.dirname(filename)
             self.lesson_dir = self.markdown_dir
-            with open(filename, 'rU') as f:
-                self.markdown = f.read()
+            with open(filename, 'rb') as f:
+                raw = f.read()
+            # Decode once, normalizing newlines as the deprecated 'rU'
+            # text mode used to do line by line. The raw bytes are kept
+            # for checks that don't need decoded text
+            self._markdown_bytes = raw
+            self.markdown = raw.decode('utf-8').replace(
+                '\r\n', '\n').replace('\r', '\n')
         else:
             # Look for linked content in ../pages (relative to this file)
-            self.lesson_dir = os.path.abspath(
-                os.path.join(os.path.dirname(__file__), os.pardir))
-
+            self.lesson_dir = DEFAULT_LESSON_DIR
             self.markdown_dir = self.lesson_dir
+            self._markdown_bytes = None
             self.markdown = markdown
 
-        ast = self._parse_markdown(self.markdown)
-        self.ast = vh.CommonMarkHelper(ast)
+        # The AST is built lazily (see the ast property below) so that
+        # validators which never look at the tree don't pay for a parse
+        self._ast = None
+
+        # Frozen copy of the template's expected headings, built once per
+        # validator instead of once per heading check
+        self._headings_set = frozenset(self.HEADINGS)
 
         # Keep track of how many times callout box styles are used
         self._callout_counts = collections.Counter()
 
-    def _parse_markdown(self, markdown):
-        parser = CommonMark.DocParser()
-        ast = parser.parse(markdown)
-        return ast
+    @property
+    def ast(self):
+        """Parsed document AST, built on first access"""
+        if self._ast is None:
+            self._ast = vh.CommonMarkHelper(
+                self._parse_markdown(self.markdown))
+            if self.filename:
+                # Every file validated as a source is a potential link
+                # target for the other pages: record its subtitle now so
+                # links to it never trigger a second read and parse
+                try:
+                    cache_key = (os.path.realpath(self.filename),
+                                 os.path.getmtime(self.filename))
+                    self._link_dest_cache[cache_key] = \
+                        self._ast.get_doc_header_subtitle()
+                except (IndexError, ValueError, OSError):
+                    # Malformed or missing header section; links to this
+                    # page will parse it themselves and report the issue
+                    pass
+        return self._ast
+
+    # Parses memoized by document text: the test suite in particular
+    # feeds the same markdown strings to many validators, and the AST is
+    # only ever read once built
+    _parse_cache = {}
+
+    @classmethod
+    def _parse_markdown(cls, markdown):
+        if markdown not in cls._parse_cache:
+            cls._parse_cache[markdown] = COMMONMARK_PARSER.parse(markdown)
+        return cls._parse_cache[markdown]
+
+    @classmethod
+    def get_dest_subtitle(cls, path):
+        """Get the (sub)title of a linked Markdown document.
+
+        The destination file is parsed at most once per run: results are
+        cached by path and modification time, so many links to the same
+        page do not trigger repeated reads and parses."""
+        # Normalize the key so a page seen as a link target matches the
+        # same page validated as a source file, and so symlinked
+        # duplicates collapse onto one entry
+        cache_key = (os.path.realpath(path), os.path.getmtime(path))
+        if cache_key not in cls._link_dest_cache:
+            with open(path, 'rb') as link_dest_file:
+                dest_contents = link_dest_file.read().decode('utf-8').replace(
+                    '\r\n', '\n').replace('\r', '\n')
+
+            dest_ast = vh.CommonMarkHelper(cls._parse_markdown(dest_contents))
+            cls._link_dest_cache[cache_key] = \
+                dest_ast.get_doc_header_subtitle()
+        return cls._link_dest_cache[cache_key]
 
     def _validate_no_fixme(self):
         """Validate that the file contains no lines marked 'FIXME'
         This will be based on the raw markdown, not the ast"""
+        if self._markdown_bytes is not None:
+            # Scan the raw bytes where available: a bytes pattern skips
+            # the Unicode machinery, and counting b'\n' still yields the
+            # right line number even before newline normalization
+            text, newline = self._markdown_bytes, b'\n'
+            matches = FIXME_BYTES_RE.finditer(text)
+        else:
+            text, newline = self.markdown, '\n'
+            matches = FIXME_RE.finditer(text)
+
         valid = True
-        for i, line in enumerate(self.markdown.splitlines()):
-            if re.search("FIXME", line, re.IGNORECASE):
-                logging.error(
-                    "In {0}: "
-                    "Line {1} contains FIXME, indicating "
-                    "work in progress".format(self.filename, i+1))
-                valid = False
+        for match in matches:
+            # Line numbers are only computed on a hit, so clean files
+            # cost a single scan in the regex engine
+            lineno = text.count(newline, 0, match.start()) + 1
+            logging.error(
+                "In %s: "
+                "Line %s contains FIXME, indicating "
+                "work in progress", self.filename, lineno)
+            valid = False
         return valid
 
     def _validate_hrs(self):
@@ -111,16 +229,16 @@ class MarkdownValidator(object):
             hr_nodes = [self.ast.children[0], self.ast.children[2]]
         except IndexError:
             logging.error(
-                "In {0}: "
-                "Document must include header sections".format(self.filename))
+                "In %s: "
+                "Document must include header sections", self.filename)
             return False
 
         for hr in hr_nodes:
             if not self.ast.is_hr(hr):
                 logging.error(
-                    "In {0}: "
-                    "Expected --- at line: {1}".format(
-                        self.filename, hr.start_line))
+                    "In %s: "
+                    "Expected --- at line: %s",
+                    self.filename, hr.start_line)
                 valid = False
         return valid
 
@@ -128,18 +246,18 @@ class MarkdownValidator(object):
         """Validate a single row of the document header section"""
         if label not in self.DOC_HEADERS:
             logging.warning(
-                "In {0}: "
-                "Unrecognized label in header section: {1}".format(
-                    self.filename, label))
+                "In %s: "
+                "Unrecognized label in header section: %s",
+                self.filename, label)
             return False
 
         validation_function = self.DOC_HEADERS[label]
         validate_header = validation_function(content)
         if not validate_header:
             logging.error(
-                "In {0}: "
-                "Contents of document header field for label {1} "
-                "do not follow expected format".format(self.filename, label))
+                "In %s: "
+                "Contents of document header field for label %s "
+                "do not follow expected format", self.filename, label)
         return validate_header
 
     # Methods related to specific validation. Can override specific tests.
@@ -158,9 +276,9 @@ class MarkdownValidator(object):
         # Parse headers as YAML. Don't check if parser returns None or str.
         header_yaml = yaml.load(header_text)
         if not isinstance(header_yaml, dict):
-            logging.error("In {0}: "
+            logging.error("In %s: "
                           "Expected YAML markup with labels "
-                          "{1}".format(self.filename, self.DOC_HEADERS.keys()))
+                          "%s", self.filename, self.DOC_HEADERS.keys())
             return False
 
         # Test: Labeled YAML should match expected format
@@ -168,16 +286,16 @@ class MarkdownValidator(object):
                         for k, v in header_yaml.items()]
 
         # Test: Must have all expected header lines, and no others.
-        only_headers = (len(header_yaml) == len(self.DOC_HEADERS))
+        #   Set equality catches a missing row even when an extra row
+        #   keeps the overall count unchanged
+        only_headers = (frozenset(header_yaml) == frozenset(self.DOC_HEADERS))
 
         # If expected headings are missing, print an informative message
-        missing_headings = [h for h in self.DOC_HEADERS
-                            if h not in header_yaml]
-
-        for h in missing_headings:
-            logging.error("In {0}: "
-                          "Header section is missing expected "
-                          "row '{1}'".format(self.filename, h))
+        for h in self.DOC_HEADERS:
+            if h not in header_yaml:
+                logging.error("In %s: "
+                              "Header section is missing expected "
+                              "row '%s'", self.filename, h)
 
         return has_hrs and all(test_headers) and only_headers
 
@@ -186,40 +304,48 @@ class MarkdownValidator(object):
         if ast_node is None:
             ast_node = self.ast.data
             headings = self.HEADINGS
+            expected_heading_set = self._headings_set
+        else:
+            expected_heading_set = frozenset(headings)
 
         heading_nodes = self.ast.get_section_headings(ast_node)
-        # All headings should be exactly level 2
+
+        # Walk the headings once, checking the level (should be exactly 2)
+        # and extracting the label text in the same pass
         correct_level = True
+        heading_labels = []
         for n in heading_nodes:
             if n.level != 2:
                 logging.error(
-                    "In {0}: "
-                    "Heading at line {1} should be level 2".format(
-                        self.filename, n.start_line))
+                    "In %s: "
+                    "Heading at line %s should be level 2",
+                    self.filename, n.start_line)
                 correct_level = False
+            heading_labels.append(vh.strip_attrs(n.strings[0]))
 
-        heading_labels = [vh.strip_attrs(n.strings[0]) for n in heading_nodes]
+        # Check for missing and extra headings. Sets make the membership
+        # tests O(1) while the lists above preserve document order
+        heading_label_set = set(heading_labels)
 
-        # Check for missing and extra headings
         missing_headings = [expected_heading for expected_heading in headings
-                            if expected_heading not in heading_labels]
+                            if expected_heading not in heading_label_set]
 
         extra_headings = [found_heading for found_heading in heading_labels
-                          if found_heading not in headings]
+                          if found_heading not in expected_heading_set]
 
         for h in missing_headings:
             logging.error(
-                "In {0}: "
-                "Document is missing expected heading: {1}".format(
-                    self.filename, h))
+                "In %s: "
+                "Document is missing expected heading: %s",
+                self.filename, h)
 
         if self.WARN_ON_EXTRA_HEADINGS is True:
             for h in extra_headings:
                 logging.error(
-                    "In {0}: "
+                    "In %s: "
                     "Document contains heading "
-                    "not specified in the template: {1}".format(
-                        self.filename, h))
+                    "not specified in the template: %s",
+                    self.filename, h)
             no_extra = (len(extra_headings) == 0)
         else:
             no_extra = True
@@ -227,13 +353,14 @@ class MarkdownValidator(object):
         # Check that the subset of headings
         # in the template spec matches order in the document
         valid_order = True
-        headings_overlap = [h for h in heading_labels if h in headings]
+        headings_overlap = [h for h in heading_labels
+                            if h in expected_heading_set]
         if len(missing_headings) == 0 and headings_overlap != headings:
             valid_order = False
             logging.error(
-                "In {0}: "
+                "In %s: "
                 "Document headings do not match "
-                "the order specified by the template".format(self.filename))
+                "the order specified by the template", self.filename)
 
         return (len(missing_headings) == 0) and \
             valid_order and no_extra and correct_level
@@ -255,37 +382,38 @@ class MarkdownValidator(object):
         title, styles = self.ast.get_heading_info(heading_node)
 
         if not valid_head_lvl:
-            logging.error("In {0}: "
-                          "Callout box titled '{1}' must start with a "
-                          "level 2 heading".format(self.filename, title))
+            logging.error("In %s: "
+                          "Callout box titled '%s' must start with a "
+                          "level 2 heading", self.filename, title)
 
         try:
             style = styles[0]
         except IndexError:
             logging.error(
-                "In {0}: "
-                "Callout section titled '{1}' must specify "
-                "a CSS style".format(self.filename, title))
+                "In %s: "
+                "Callout section titled '%s' must specify "
+                "a CSS style", self.filename, title)
             return False
 
         # Track # times this style is used in any callout
         self._callout_counts[style] += 1
 
-        # Verify style actually in callout spec
-        if style not in self.CALLOUTS:
+        # Verify style actually in callout spec (one lookup, not two)
+        spec = self.CALLOUTS.get(style)
+        if spec is None:
             spec_title = None
             valid_style = False
         else:
-            spec_title, _, _ = self.CALLOUTS[style]
+            spec_title = spec[0]
             valid_style = True
 
         has_children = self.ast.has_number_children(callout_node, minc=2)
         if spec_title is not None and title != spec_title:
             # Callout box must have specified heading title
             logging.error(
-                "In {0}: "
-                "Callout section with style '{1}' should have "
-                "title '{2}'".format(self.filename, style, spec_title))
+                "In %s: "
+                "Callout section with style '%s' should have "
+                "title '%s'", self.filename, style, spec_title)
             valid_title = False
         else:
             valid_title = True
@@ -309,25 +437,24 @@ class MarkdownValidator(object):
 
         found_styles = self._callout_counts
 
-        # Issue error if style is not present correct # times
-        missing_styles = [style
+        # Issue error if style is not present correct # times. Carrying the
+        # bounds along avoids re-indexing the spec in the error loop
+        missing_styles = [(style, minc, maxc)
                           for style, (title, minc, maxc) in self.CALLOUTS.items()
                           if not ((minc or 0) <= found_styles[style]
                                   <= (maxc or sys.maxsize))]
         unknown_styles = [k for k in found_styles if k not in self.CALLOUTS]
 
         for style in unknown_styles:
-            logging.error("In {0}: "
+            logging.error("In %s: "
                           "Found callout box with unrecognized "
-                          "style '{1}'".format(self.filename, style))
+                          "style '%s'", self.filename, style)
 
-        for style in missing_styles:
-            minc = self.CALLOUTS[style][1]
-            maxc = self.CALLOUTS[style][2]
-            logging.error("In {0}: "
-                          "Expected between min {1} and max {2} callout boxes "
-                          "with style '{3}'".format(
-                self.filename, minc, maxc, style))
+        for style, minc, maxc in missing_styles:
+            logging.error("In %s: "
+                          "Expected between min %s and max %s callout boxes "
+                          "with style '%s'",
+                          self.filename, minc, maxc, style)
 
         return (callouts_valid and
                 len(missing_styles) == 0 and len(unknown_styles) == 0)
@@ -348,31 +475,26 @@ class MarkdownValidator(object):
         expected_md_fn = os.path.splitext(fn)[0] + os.extsep + "md"
         expected_md_path = os.path.join(self.markdown_dir,
                                         expected_md_fn)
-        if not os.path.isfile(expected_md_path):
+        if not _isfile(expected_md_path):
             logging.error(
-                "In {0}: "
-                "The document links to {1}, but could not find "
-                "the expected markdown file {2}".format(
-                    self.filename, fn, expected_md_path))
+                "In %s: "
+                "The document links to %s, but could not find "
+                "the expected markdown file %s",
+                self.filename, fn, expected_md_path)
             return False
 
         if check_text is True:
             # If file exists, parse and validate link text = node title
-            with open(expected_md_path, 'rU') as link_dest_file:
-                dest_contents = link_dest_file.read()
-
-            dest_ast = self._parse_markdown(dest_contents)
-            dest_ast = vh.CommonMarkHelper(dest_ast)
-            dest_page_title = dest_ast.get_doc_header_subtitle()
+            dest_page_title = self.get_dest_subtitle(expected_md_path)
 
             if dest_page_title != link_text:
                 logging.error(
-                    "In {0}: "
-                    "The linked page {1} exists, but "
-                    "the link text '{2}' does not match the "
-                    "(sub)title of that page, '{3}'.".format(
-                        self.filename, dest,
-                        link_text, dest_page_title))
+                    "In %s: "
+                    "The linked page %s exists, but "
+                    "the link text '%s' does not match the "
+                    "(sub)title of that page, '%s'.",
+                    self.filename, dest,
+                    link_text, dest_page_title)
                 return False
         return True
 
@@ -385,30 +507,29 @@ class MarkdownValidator(object):
         """
         dest, link_text = self.ast.get_link_info(link_node)
 
-        if re.match(r"^[\w,\s-]+\.(html?)", dest, re.IGNORECASE):
+        if LOCAL_HTML_LINK_RE.match(dest):
             # Validate local html links have matching md file
             return self._validate_one_html_link(link_node,
                                                 check_text=check_text)
-        elif not re.match(r"^((https?|ftp)://.+)|mailto:",
-                          dest, re.IGNORECASE)\
-                and not re.match(r"^#.*", dest):
+        elif not dest.lower().startswith(REMOTE_LINK_PREFIXES) \
+                and not dest.startswith("#"):
             # If not web or email URL, and not anchor on same page, then
             #  verify that local file exists
             dest_path = os.path.join(self.lesson_dir, dest)
             dest_path = dest_path.split("#")[0]  # Split anchor from filename
-            if not os.path.isfile(dest_path):
+            if not _isfile(dest_path):
                 fn = dest.split("#")[0]  # Split anchor name from filename
                 logging.error(
-                    "In {0}: "
+                    "In %s: "
                     "Could not find the linked asset file "
-                    "{1} in {2}. If this is a URL, it must be "
-                    "prefixed with http(s):// or ftp://.".format(
-                        self.filename, fn, dest_path))
+                    "%s in %s. If this is a URL, it must be "
+                    "prefixed with http(s):// or ftp://.",
+                    self.filename, fn, dest_path)
                 return False
         else:
             logging.debug(
-                "In {0}: "
-                "Skipped validation of link {1}".format(self.filename, dest))
+                "In %s: "
+                "Skipped validation of link %s", self.filename, dest)
         return True
 
     def _partition_links(self):
@@ -429,12 +550,24 @@ class MarkdownValidator(object):
         CommonMark assigns a .destination property"""
         check_text, no_check_text = self._partition_links()
 
+        # A page often references the same destination many times; each
+        # unique (destination, text) pair only needs to be checked once
+        seen = set()
+
         valid = True
         for link_node in check_text:
+            key = (True,) + self.ast.get_link_info(link_node)
+            if key in seen:
+                continue
+            seen.add(key)
             res = self._validate_one_link(link_node, check_text=True)
             valid = valid and res
 
         for link_node in no_check_text:
+            key = (False,) + self.ast.get_link_info(link_node)
+            if key in seen:
+                continue
+            seen.add(key)
             res = self._validate_one_link(link_node, check_text=False)
             valid = valid and res
         return valid
@@ -445,13 +578,21 @@ class MarkdownValidator(object):
 
         Error trapping is handled by the validate() wrapper method.
         """
-        tests = [self._validate_no_fixme(),
-                 self._validate_doc_headers(),
-                 self._validate_section_heading_order(),
-                 self._validate_callouts(),
-                 self._validate_links()]
+        tests = [self._validate_no_fixme,
+                 self._validate_doc_headers,
+                 self._validate_section_heading_order,
+                 self._validate_callouts,
+                 self._validate_links]
+
+        if STOP_ON_FIRST_FAILURE:
+            # Skip the remaining (possibly expensive) tests as soon as
+            # one fails
+            for test in tests:
+                if not test():
+                    return False
+            return True
 
-        return all(tests)
+        return all([test() for test in tests])
 
     def validate(self):
         """Perform all required validations. Wrap in exception handler"""
@@ -496,14 +637,16 @@ class IndexPageValidator(MarkdownValidator):
         intro_section = self.ast.is_paragraph(intro_block)
         if not intro_section:
             logging.error(
-                "In {0}: "
-                "Expected paragraph of introductory text at {1}".format(
-                    self.filename, intro_block.start_line))
+                "In %s: "
+                "Expected paragraph of introductory text at %s",
+                self.filename, intro_block.start_line)
 
         return intro_section
 
     def _run_tests(self):
         parent_tests = super(IndexPageValidator, self)._run_tests()
+        if STOP_ON_FIRST_FAILURE and not parent_tests:
+            return False
         tests = [self._validate_intro_section()]
         return all(tests) and parent_tests
 
@@ -528,16 +671,18 @@ class TopicPageValidator(MarkdownValidator):
         if len(heading_nodes) != 0:
             # Individual heading msgs are logged by validate_section_heading_order
             logging.warning(
-                "In {0}: "
+                "In %s: "
                 "Sub-headings are often a sign "
                 "a lesson needs to be split into multiple topics. "
                 "Please make sure this subsection doesn't belong "
-                "in a separate lesson.".format(self.filename))
+                "in a separate lesson.", self.filename)
 
         return True
 
     def _run_tests(self):
         parent_tests = super(TopicPageValidator, self)._run_tests()
+        if STOP_ON_FIRST_FAILURE and not parent_tests:
+            return False
         tests = [self._validate_has_no_headings()]
         return all(tests) and parent_tests
 
@@ -571,21 +716,21 @@ class ReferencePageValidator(MarkdownValidator):
         glossary_keyword = glossary_entry[0]
         if len(glossary_entry) < 2:
             logging.error(
-                "In {0}: "
-                "Glossary entry '{1}' must have at least two lines- "
-                "a term and a definition.".format(
-                    self.filename, glossary_keyword))
+                "In %s: "
+                "Glossary entry '%s' must have at least two lines- "
+                "a term and a definition.",
+                self.filename, glossary_keyword)
             return False
 
         entry_is_valid = True
         for line_index, line in enumerate(glossary_entry):
-            if line_index == 1 and not re.match("^:   ", line):
+            if line_index == 1 and not GLOSSARY_DEFINITION_RE.match(line):
                 logging.error(
-                    "In {0}: "
-                    "At glossary entry '{1}' "
+                    "In %s: "
+                    "At glossary entry '%s' "
                     "First line of definition must "
-                    "start with ':    '.".format(
-                        self.filename, glossary_keyword))
+                    "start with ':    '.",
+                    self.filename, glossary_keyword)
                 entry_is_valid = False
         return entry_is_valid
 
@@ -610,6 +755,8 @@ class ReferencePageValidator(MarkdownValidator):
 
     def _run_tests(self):
         tests = [self._validate_glossary()]
+        if STOP_ON_FIRST_FAILURE and not all(tests):
+            return False
         parent_tests = super(ReferencePageValidator, self)._run_tests()
         return all(tests) and parent_tests
 
@@ -634,17 +781,33 @@ class InstructorPageValidator(MarkdownValidator):
 
 
 class LicensePageValidator(MarkdownValidator):
-    """Validate LICENSE.md: user should not edit this file"""
+    """Validate LICENSE.md: user should not edit this file
+
+    The only test performed on this page is a hash comparison, so the
+    (lazy) Markdown parse in the base class is never triggered."""
+
     def _run_tests(self):
         """Skip the base tests; just check md5 hash"""
         # TODO: This hash is specific to the license for english-language repo
         expected_hash = '051a04b8ffe580ba6b7018fb4fd72a50'
-        m = hashlib.md5()
+        expected_length = 3227  # Characters in the decoded license text
+
+        # Documents of different lengths can never hash the same:
+        # skip the hashing work when the length already gives it away
+        if len(self.markdown) != expected_length:
+            logging.error("The provided license file should not be modified.")
+            return False
+
+        # The markdown is always text after the single decode in __init__,
+        # so encode unconditionally for hashing. This is an integrity
+        # check, not a security boundary: saying so lets restricted
+        # (FIPS) builds keep md5 available and pick faster backends
         try:
-            m.update(self.markdown)
+            m = hashlib.md5(self.markdown.encode('utf-8'),
+                            usedforsecurity=False)
         except TypeError:
-            # Workaround for hashing in python3
-            m.update(self.markdown.encode('utf-8'))
+            # usedforsecurity requires python >= 3.9
+            m = hashlib.md5(self.markdown.encode('utf-8'))
 
         if m.hexdigest() == expected_hash:
             return True
@@ -665,17 +828,24 @@ class DiscussionPageValidator(MarkdownValidator):
 
 
 # Associate lesson template names with validators. This list used by CLI.
-#   Dict of {name: (Validator, filename_pattern)}
-LESSON_TEMPLATES = {"index": (IndexPageValidator, "^index"),
-                    "topic": (TopicPageValidator, "^[0-9]{2}-.*"),
-                    "reference": (ReferencePageValidator, "^reference"),
-                    "instructor": (InstructorPageValidator, "^instructors"),
-                    "license": (LicensePageValidator, "^LICENSE"),
-                    "discussion": (DiscussionPageValidator, "^discussion")}
+#   Dict of {name: (Validator, compiled_filename_pattern)}
+LESSON_TEMPLATES = {
+    "index": (IndexPageValidator, re.compile("^index")),
+    "topic": (TopicPageValidator, re.compile("^[0-9]{2}-.*")),
+    "reference": (ReferencePageValidator, re.compile("^reference")),
+    "instructor": (InstructorPageValidator, re.compile("^instructors")),
+    "license": (LicensePageValidator, re.compile("^LICENSE")),
+    "discussion": (DiscussionPageValidator, re.compile("^discussion"))}
+
+# Files in the lesson directory that should not be validated at all.
+#   A frozenset makes the per-file membership test O(1)
+SKIP_FILES = frozenset(("CONDUCT.md", "CONTRIBUTING.md",
+                        "DESIGN.md", "FAQ.md", "LAYOUT.md", "README.md"))
 
-# List of files in the lesson directory that should not be validated at all
-SKIP_FILES = ("CONDUCT.md", "CONTRIBUTING.md",
-              "DESIGN.md", "FAQ.md", "LAYOUT.md", "README.md")
+
+# Cache of {basename: template_name}: lessons reuse a handful of filename
+# shapes, so each name only needs to be matched against the patterns once
+_TEMPLATE_CACHE = {}
 
 
 def identify_template(filepath):
@@ -683,11 +853,19 @@ def identify_template(filepath):
 
     Given the path to a single file,
     identify the appropriate template to use"""
+    base = os.path.basename(filepath)
+    if base in _TEMPLATE_CACHE:
+        return _TEMPLATE_CACHE[base]
+
+    result = None
     for template_name, (validator, pattern) in LESSON_TEMPLATES.items():
-        if re.search(pattern, os.path.basename(filepath)):
-            return template_name
+        # All the template patterns are anchored at the start of the name
+        if pattern.match(base):
+            result = template_name
+            break
 
-    return None
+    _TEMPLATE_CACHE[base] = result
+    return result
 
 
 def validate_single(filepath, template=None):
@@ -699,44 +877,96 @@ def validate_single(filepath, template=None):
     template = template or identify_template(filepath)
     if template is None:
         logging.error(
-            "Validation failed for {0}: "
-            "Could not automatically identify correct template.".format(
-                filepath))
+            "Validation failed for %s: "
+            "Could not automatically identify correct template.",
+            filepath)
         return False
 
     logging.debug(
-        "Beginning validation of {0} using template {1}".format(
-            filepath, template))
+        "Beginning validation of %s using template %s",
+        filepath, template)
     validator = LESSON_TEMPLATES[template][0]
     validate_file = validator(filepath)
 
     res = validate_file.validate()
     if res is True:
-        logging.debug("File {0} successfully passed validation".format(
-            filepath))
+        logging.debug("File %s successfully passed validation", filepath)
     else:
-        logging.debug("File {0} failed validation: "
-                      "see error log for details".format(filepath))
+        logging.debug("File %s failed validation: "
+                      "see error log for details", filepath)
 
     return res
 
 
+def _validate_single_in_worker(args):
+    """Run validate_single in a worker process.
+
+    Returns the validation result together with the number of errors
+    logged for this file, so that the parent process can keep its own
+    error count accurate."""
+    global STOP_ON_FIRST_FAILURE
+    filepath, template, fail_fast = args
+    # Workers started via spawn re-import this module and would only see
+    # the flag's default, so the parent's setting travels with the work
+    STOP_ON_FIRST_FAILURE = fail_fast
+    errors_before = NUMBER_OF_ERRORS
+    res = validate_single(filepath, template=template)
+    return res, NUMBER_OF_ERRORS - errors_before
+
+
+def validate_many(filename_list, template=None):
+    """Validate a list of files, in parallel where possible.
+
+    Each file is validated independently, so the work is fanned out
+    across one worker process per CPU. Falls back to a serial loop when
+    process pools are unavailable, or when there is only one file."""
+    global NUMBER_OF_ERRORS
+
+    if futures is None or len(filename_list) < 2:
+        all_valid = True
+        for fn in filename_list:
+            res = validate_single(fn, template=template)
+            all_valid = all_valid and res
+        return all_valid
+
+    # Re-initialize logging in each worker so messages reach the console
+    log_level = logging.getLogger().getEffectiveLevel()
+    with futures.ProcessPoolExecutor(initializer=start_logging,
+                                     initargs=(log_level,)) as pool:
+        results = list(pool.map(_validate_single_in_worker,
+                                [(fn, template, STOP_ON_FIRST_FAILURE)
+                                 for fn in filename_list]))
+
+    all_valid = True
+    for res, error_count in results:
+        NUMBER_OF_ERRORS += error_count
+        all_valid = all_valid and res
+    return all_valid
+
+
+def _list_directory(path):
+    """List the filenames in a directory exactly once.
+
+    Several checks look for files in the same folder; sharing one listing
+    avoids re-reading the directory for every filename pattern."""
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
 def validate_folder(path, template=None):
     """Validate an entire folder of files"""
-    search_str = os.path.join(path, "*.md")  # Find files based on extension
-    filename_list = glob.glob(search_str)
+    filename_list = [os.path.join(path, fn)  # Find files based on extension
+                     for fn in fnmatch.filter(_list_directory(path), "*.md")]
 
     if not filename_list:
         logging.error(
             "No Markdown files were found "
-            "in specified directory {0}".format(path))
+            "in specified directory %s", path)
         return False
 
-    all_valid = True
-    for fn in filename_list:
-        res = validate_single(fn, template=template)
-        all_valid = all_valid and res
-    return all_valid
+    return validate_many(filename_list, template=template)
 
 
 def start_logging(level=logging.INFO):
@@ -763,6 +993,12 @@ def command_line():
                         action='store_true',
                         help="Enable debug information.")
 
+    parser.add_argument('--fail-fast',
+                        action='store_true',
+                        help="Stop validating each file at its first "
+                             "failed test, instead of reporting every "
+                             "error in the file.")
+
     return parser.parse_args()
 
 
@@ -779,11 +1015,14 @@ def check_required_files(dir_to_validate):
                       "reference.md"]
     valid = True
 
+    # One directory listing serves all the filename patterns above
+    filenames = _list_directory(dir_to_validate)
+
     for required in REQUIRED_FILES:
-        req_fn = os.path.join(dir_to_validate, required)
-        if not glob.glob(req_fn):
+        # any() stops at the first name matching the pattern
+        if not any(fnmatch.fnmatch(fn, required) for fn in filenames):
             logging.error(
-                "Missing file {0}.".format(required))
+                "Missing file %s.", required)
             valid = False
 
     return valid
@@ -796,20 +1035,24 @@ def get_files_to_validate(file_or_path):
 
     for fn in file_or_path:
         if os.path.isdir(fn):
-            search_str = os.path.join(fn, "*.md")
-            files_to_validate.extend(glob.glob(search_str))
+            files_to_validate.extend(
+                os.path.join(fn, name)
+                for name in fnmatch.filter(_list_directory(fn), "*.md"))
             dirs_to_validate.append(fn)
         elif os.path.isfile(fn):
             files_to_validate.append(fn)
         else:
             logging.error(
-                "The specified file or folder {0} does not exist; "
-                "could not perform validation".format(fn))
+                "The specified file or folder %s does not exist; "
+                "could not perform validation", fn)
 
     return files_to_validate, dirs_to_validate
 
 
 def main(parsed_args_obj):
+    global STOP_ON_FIRST_FAILURE
+    STOP_ON_FIRST_FAILURE = parsed_args_obj.fail_fast
+
     if parsed_args_obj.debug:
         log_level = "DEBUG"
     else:
@@ -825,19 +1068,20 @@ def main(parsed_args_obj):
 
     # If user ask to validate only one file don't check for required files.
     for d in dirs_to_validate:
-        all_valid = all_valid and check_required_files(d)
-
-    for fn in files_to_validate:
-        res = validate_single(fn, template=template)
-
+        # Run the check before and-ing so one bad directory doesn't
+        # short-circuit the checks for the remaining directories
+        res = check_required_files(d)
         all_valid = all_valid and res
 
+    res = validate_many(files_to_validate, template=template)
+    all_valid = all_valid and res
+
     if all_valid is True:
         logging.debug("All Markdown files successfully passed validation.")
     else:
         logging.warning(
-            "{0} errors were encountered during validation. "
-            "See log for details.".format(NUMBER_OF_ERRORS))
+            "%s errors were encountered during validation. "
+            "See log for details.", NUMBER_OF_ERRORS)
     sys.exit(NUMBER_OF_ERRORS)
 
 
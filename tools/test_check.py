@@ -556,7 +556,7 @@ class TestLicensePage(BaseTemplateTest):
         self.assertTrue(res)
 
     def test_modified_file_fails_validation(self):
-        with open(self.SAMPLE_FILE, 'rU') as f:
+        with open(self.SAMPLE_FILE, 'r') as f:
             orig_text = f.read()
         mod_text = orig_text.replace("The", "the")
         validator = self._create_validator(mod_text)
@@ -573,5 +573,42 @@ class TestDiscussionPage(BaseTemplateTest):
         self.assertTrue(res)
 
 
+class TestFailFast(BaseTemplateTest):
+    """Verifies that the --fail-fast flag stops a file's validations
+    at the first failure"""
+    VALIDATOR = check.MarkdownValidator
+
+    def setUp(self):
+        self.orig_flag = check.STOP_ON_FIRST_FAILURE
+
+    def tearDown(self):
+        check.STOP_ON_FIRST_FAILURE = self.orig_flag
+
+    def _create_recording_validator(self):
+        """Validator whose first test (the FIXME check) fails; records
+        whether the later header check was reached"""
+        validator = self._create_validator("""Incomplete sentence (FIXME).""")
+        validator.ran_headers_check = False
+
+        def record_headers_check():
+            validator.ran_headers_check = True
+            return True
+
+        validator._validate_doc_headers = record_headers_check
+        return validator
+
+    def test_fail_fast_skips_later_validations(self):
+        check.STOP_ON_FIRST_FAILURE = True
+        validator = self._create_recording_validator()
+        self.assertFalse(validator.validate())
+        self.assertFalse(validator.ran_headers_check)
+
+    def test_all_validations_run_by_default(self):
+        check.STOP_ON_FIRST_FAILURE = False
+        validator = self._create_recording_validator()
+        self.assertFalse(validator.validate())
+        self.assertTrue(validator.ran_headers_check)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,10 +5,9 @@ import logging
 import re
 import sys
 
-try:  # Hack to make codebase compatible with python 2 and 3
-  basestring
-except NameError:
-  basestring = str
+if sys.version_info[0] >= 3:
+    # Hack to make codebase compatible with python 2 and 3
+    basestring = str
 
 
 # Common validation functions
@@ -18,7 +17,7 @@ def is_list(text):
     try:
         text_as_list = json.loads(text)
     except ValueError:
-        logging.debug("Could not convert string to python object: {0}".format(text))
+        logging.debug("Could not convert string to python object: %s", text)
         return False
 
     return isinstance(text_as_list, list)
@@ -29,8 +28,18 @@ def is_str(text):
     return isinstance(text, basestring) and len(text) > 0
 
 
+# Matches the common decimal forms so is_numeric can usually answer
+# without running float() in a try/except
+_NUM_RE = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+
 def is_numeric(text):
     """Validate whether the string represents a number (including unicode)"""
+    if isinstance(text, basestring) and _NUM_RE.match(text.strip()):
+        return True
+
+    # Fall back for the less common spellings float() accepts
+    # (inf, nan, unicode digits, ...)
     try:
         float(text)
         return True
@@ -39,15 +48,31 @@ def is_numeric(text):
 
 
 #### Text cleanup functions, pre-validation
+
+# Applied to every heading string: compile once at import instead of
+# going through the re module cache on each call
+_ATTR_RE = re.compile(r"\s\{\..*?\}")
+_CSS_CLASS_RE = re.compile(r"\{\.(.*?)\}")
+
+# strip_attrs is applied to the same heading strings over and over (once
+# per membership test), so memoize results by the input string
+_STRIP_ATTRS_CACHE = {}
+
+
 def strip_attrs(s):
     """Strip attributes of the form {.name} from a markdown title string"""
-    return re.sub(r"\s\{\..*?\}", "", s)
+    try:
+        return _STRIP_ATTRS_CACHE[s]
+    except KeyError:
+        result = _ATTR_RE.sub("", s)
+        _STRIP_ATTRS_CACHE[s] = result
+        return result
 
 
 def get_css_class(s):
     """Return any and all CSS classes (when a line is suffixed by {.classname})
     Returns empty list when """
-    return re.findall("\{\.(.*?)\}", s)
+    return _CSS_CLASS_RE.findall(s)
 
 
 ### Helper objects
@@ -58,31 +83,58 @@ class CommonMarkHelper(object):
         self.data = ast
         self.children = self.data.children
 
+        # Classify the top-level children in a single pass: every validator
+        # asks for headings and callouts, and re-scanning the tree for each
+        # query repeats the same work
+        self._section_headings = []
+        self._callouts = []
+        for n in self.children:
+            if self.is_heading(n):
+                self._section_headings.append(n)
+            if self.is_callout(n):
+                self._callouts.append(n)
+
+        # Document-wide link list, computed on first use
+        self._external_links = None
+
+        # Parsed YAML header block, computed on first use
+        self._header_map = None
+
+        # Heading lists for sub-nodes, keyed by node identity: the same
+        # blockquote is scanned once per expected title otherwise. Nodes
+        # stay alive through self.data, so ids remain stable
+        self._heading_cache = {}
+
+    def _doc_header_map(self):
+        """Split the YAML header lines into a {label: contents} dict once,
+        so each header lookup is a dict access instead of a fresh scan"""
+        if self._header_map is None:
+            doc_headers = self.data.children[1]  # Throw index error if none found
+
+            header_map = {}
+            for s in doc_headers.strings:
+                label, sep, contents = s.partition(":")
+                if not sep:
+                    # Wrapped value continuation or malformed line; skip it
+                    # rather than aborting the lookup
+                    continue
+                # setdefault keeps the first occurrence, matching the old
+                # first-match-wins scan
+                header_map.setdefault(label.lower(), contents.strip())
+            self._header_map = header_map
+        return self._header_map
+
     def get_doc_header_title(self):
         """Helper method for SWC templates: get the document title from
         the YAML headers"""
-        doc_headers = self.data.children[1]  # Throw index error if none found
-
-        for s in doc_headers.strings:
-            label, contents = s.split(":", 1)
-            if label.lower() == "title":
-                return contents.strip()
-
         # If title not found, return an empty string for display purposes
-        return ''
+        return self._doc_header_map().get("title", '')
 
     def get_doc_header_subtitle(self):
         """Helper method for SWC templates: get the document title from
         the YAML headers"""
-        doc_headers = self.data.children[1]  # Throw index error if none found
-
-        for s in doc_headers.strings:
-            label, contents = s.split(":", 1)
-            if label.lower() == "subtitle":
-                return contents.strip()
-
         # If title not found, return an empty string for display purposes
-        return ''
+        return self._doc_header_map().get("subtitle", '')
 
     def get_block_titled(self, title, heading_level=2, ast_node=None):
         """Examine children. Return all children of the given node that:
@@ -96,9 +148,14 @@ class CommonMarkHelper(object):
         # TODO: Deprecate in favor of callout validator
         if ast_node is None:
             ast_node = self.data
+
+        # Bind the predicates to locals: the comprehension calls them
+        # once per child
+        is_block = self.is_block
+        has_heading = self.has_section_heading
         return [n for n in ast_node.children
-                if self.is_block(n) and
-                self.has_section_heading(
+                if is_block(n) and
+                has_heading(
                     title,
                     ast_node=n,
                     heading_level=heading_level,
@@ -108,35 +165,59 @@ class CommonMarkHelper(object):
     def get_section_headings(self, ast_node=None):
         """Returns a list of ast nodes that are headings"""
         if ast_node is None:
-            ast_node = self.data
-        return [n for n in ast_node.children if self.is_heading(n)]
+            return self._section_headings
+
+        key = id(ast_node)
+        if key not in self._heading_cache:
+            self._heading_cache[key] = [n for n in ast_node.children
+                                        if self.is_heading(n)]
+        return self._heading_cache[key]
 
     def get_callouts(self, ast_node=None):
         if ast_node is None:
-            ast_node = self.data
+            return self._callouts
         return [n for n in ast_node.children if self.is_callout(n)]
 
     def find_external_links(self, ast_node=None, parent_crit=None):
-        """Recursive function that locates all references to external content
-         under specified node. (links or images)"""
-        ast_node = ast_node or self.data
+        """Locate all references to external content under specified node.
+        (links or images)"""
+        if ast_node is None and parent_crit is None:
+            # Most callers want every link in the document: compute that
+            # list once per document and reuse it
+            if self._external_links is None:
+                self._external_links = self._find_links(self.data, None)
+            return self._external_links
+
+        return self._find_links(ast_node or self.data, parent_crit)
+
+    def _find_links(self, ast_node, parent_crit):
+        """Iterative worker for find_external_links.
+
+        Walks the tree with an explicit stack rather than recursion:
+        deep documents stay clear of the recursion limit, and each node
+        costs one loop iteration instead of a function call."""
         if parent_crit is None:
             # User can optionally provide a function to filter link list
             # based on where link appears. (eg, only links in headings)
             # If no filter is provided, accept all links in that node.
             parent_crit = lambda n: True
 
-        # Link can be node itself, or hiding in inline content
-        links = [n for n in ast_node.inline_content
-                 if self.is_external(n) and parent_crit(ast_node)]
+        is_external = self.is_external
+        links = []
+        stack = [ast_node]
+        while stack:
+            node = stack.pop()
+
+            # Link can be node itself, or hiding in inline content
+            if parent_crit(node):
+                links.extend(n for n in node.inline_content
+                             if is_external(n))
 
-        if self.is_external(ast_node):
-            links.append(ast_node)
+            if is_external(node):
+                links.append(node)
 
-        # Also look for links in sub-nodes
-        for n in ast_node.children:
-            links.extend(self.find_external_links(n,
-                                                  parent_crit=parent_crit))
+            # Also look for links in sub-nodes, preserving document order
+            stack.extend(reversed(node.children))
 
         return links
 
@@ -169,20 +250,20 @@ class CommonMarkHelper(object):
         if ast_node is None:
             ast_node = self.data
 
-        num_nodes = len([n for n in self.get_section_headings(ast_node)
-                         if (strip_attrs(n.strings[0]) == section_title)
-                         and (n.level == heading_level)])
+        num_nodes = sum(1 for n in self.get_section_headings(ast_node)
+                        if (n.level == heading_level)
+                        and (strip_attrs(n.strings[0]) == section_title))
 
         # Suppress error msg if used as a helper method
         if show_msg and num_nodes == 0:
             logging.error("Document does not contain the specified "
-                          "heading: {0}".format(section_title))
+                          "heading: %s", section_title)
         elif show_msg and num_nodes > limit:
-            logging.error("Document must not contain more than {0} copies of"
-                          " the heading {1}".format(limit, section_title or 0))
+            logging.error("Document must not contain more than %s copies of"
+                          " the heading %s", limit, section_title or 0)
         elif show_msg:
             logging.info("Verified that document contains the specified"
-                         " heading: {0}".format(section_title))
+                         " heading: %s", section_title)
         return (0 < num_nodes <= limit)
 
     def has_number_children(self, ast_node,